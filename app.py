@@ -1,31 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from io import BytesIO
+import hashlib
+import os
+import tempfile
+import threading
+import click
 import requests
-from flask import Flask, jsonify, send_file, request
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache, cached
+from flask import (
+    Flask,
+    Response,
+    send_file,
+    send_from_directory,
+    request,
+)
 from nba_api.stats.library.parameters import LocationNullable
 from werkzeug.middleware.proxy_fix import ProxyFix
+from flask_compress import Compress
 from flask_cors import CORS
-from matplotlib import pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.collections import PatchCollection
 from matplotlib.patches import Circle, Rectangle, Arc
 from datetime import datetime
 from nba_api.live.nba.endpoints import scoreboard
+from nba_api.live.nba.library.http import NBALiveHTTP
 from nba_api.stats.static import teams
 from nba_api.stats.endpoints import shotchartdetail, leaguegamefinder
+from nba_api.stats.library.http import NBAStatsHTTP
+from PIL import Image
 import matplotlib.colors as mc
 import colorsys
-import cairosvg
-
-# Use the 'Agg' backend for Matplotlib
-import matplotlib
-
-matplotlib.use("Agg")
+import numpy as np
+import orjson
+import pandas as pd
 
 app = Flask(__name__)
 CORS(app)
+# Compress JSON responses for clients that accept it; PNGs are already
+# compressed and are left alone
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+app.config["COMPRESS_MIN_SIZE"] = 512
+Compress(app)
 # Add the following line to use the ProxyFix middleware
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
 
 # Configuration Constants
 SHOT_CHART_FILENAME_TEMPLATE = "{game_id_nullable}_{team_id}_{player_id}_shot_chart.png"
+# Rendered shot charts are kept this many seconds so live games stay current
+SHOT_CHART_CACHE_TTL = 60
+SHOT_CHART_CACHE_SIZE = 512
+# zlib level for shot chart PNGs; 3 encodes as fast as 1 but ~12% smaller,
+# while the default 6 is ~50% slower for ~25% fewer bytes
+SHOT_CHART_COMPRESS_LEVEL = 3
+LOGO_DIRECTORY = os.path.join(app.static_folder, "logos")
+LOGO_FILENAME_TEMPLATE = "{team_id}_{letter}.png"
+LOGO_CACHE_CONTROL = "public, max-age=86400, immutable"
+CDN_TIMEOUT = 5
+# (connect, read) timeouts for NBA stats and live data calls. Reads that time
+# out are not retried (see SESSION), so a silent upstream holds a worker for
+# at most two connect attempts plus one read, about 16 seconds
+STATS_TIMEOUT = (3.05, 10)
 
 STATS_HEADERS = {
     "Host": "stats.nba.com",
@@ -41,80 +79,169 @@ STATS_HEADERS = {
     "Cache-Control": "no-cache",
 }
 
+# Share one pooled keep-alive session between our own requests and nba_api's,
+# so warm connections skip the TCP and TLS handshakes
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_maxsize=20,
+        # Retry a failed connect once and the gateway errors stats.nba.com
+        # returns when overloaded, handing back the last response rather than
+        # raising once out of tries. A read timeout is never retried, as each
+        # retry would wait out the full timeout again.
+        max_retries=Retry(
+            total=2,
+            connect=1,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            raise_on_status=False,
+        ),
+    ),
+)
+NBAStatsHTTP.set_session(SESSION)
+NBALiveHTTP.set_session(SESSION)
+
+# Threads for upstream requests that can run alongside the one a view is
+# waiting on
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+
+# Function to build a JSON response with orjson, which is much faster than
+# jsonify's stdlib encoder and also handles NumPy values
+def ojsonify(data):
+    return Response(
+        orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY),
+        mimetype="application/json",
+    )
+
 
 # Endpoint to get a team's light logo by abbreviation
 # Sample URL: https://normal-dinosaur-yearly.ngrok-free.app/api/nba/images/logos/team/dark/LAL
 @app.route("/api/nba/images/logos/team/<theme>/<abbreviation>", methods=["GET"])
 def get_team_logo(theme, abbreviation):
-    team = teams.find_team_by_abbreviation(abbreviation)
+    team = find_team(abbreviation)
 
     if not team:
-        return jsonify({"error": "Team not found"}), 404
+        return ojsonify({"error": "Team not found"}), 404
 
     team_id = team["id"]
     letter = theme.upper()[0] if theme.lower() in ["light", "dark"] else "L"
 
+    logo_filename = LOGO_FILENAME_TEMPLATE.format(team_id=team_id, letter=letter)
+
+    # Logos are rasterized once, after that they are served straight from disk
+    if not os.path.exists(team_logo_path(team_id, letter)):
+        try:
+            save_team_logo(team_id, letter)
+        except requests.exceptions.RequestException as e:
+            return ojsonify({"error": f"Error fetching logo: {e}"}), 500
+        except Exception as e:
+            return ojsonify({"error": f"Error converting SVG to PNG: {e}"}), 500
+
+    # Logos effectively never change, so browsers may keep them for a day and
+    # revalidate with the ETag
+    response = send_from_directory(
+        LOGO_DIRECTORY,
+        logo_filename,
+        mimetype="image/png",
+        as_attachment=True,
+        download_name=f"{abbreviation}_logo.png",
+    )
+    response.headers["Cache-Control"] = LOGO_CACHE_CONTROL
+    return response
+
+
+# Pre-render every team's light and dark logo, so that no request has to
+# fetch and rasterize one itself
+# Usage: flask --app app render-logos
+@app.cli.command("render-logos")
+def render_logos():
+    failures = 0
+    for team in teams.get_teams():
+        for letter in ["L", "D"]:
+            # Logos never change, so anything already on disk is left alone
+            if os.path.exists(team_logo_path(team["id"], letter)):
+                continue
+
+            # Keep going past a failed logo; the endpoint retries it on demand
+            try:
+                save_team_logo(team["id"], letter)
+            except Exception as e:
+                failures += 1
+                click.echo(
+                    f"Error rendering {team['abbreviation']} logo ({letter}): {e}",
+                    err=True,
+                )
+
+    if failures:
+        raise click.ClickException(f"{failures} logo(s) could not be rendered")
+
+
+# Function to get the path a team's rasterized logo is stored at
+def team_logo_path(team_id, letter):
+    return os.path.join(
+        LOGO_DIRECTORY, LOGO_FILENAME_TEMPLATE.format(team_id=team_id, letter=letter)
+    )
+
+
+# Rasterize a team's logo into the logo directory
+def save_team_logo(team_id, letter):
+    png_data = render_team_logo(team_id, letter)
+
+    # Write to a temporary file first so a concurrent request never sends a
+    # half written logo
+    os.makedirs(LOGO_DIRECTORY, exist_ok=True)
+    logo_path = team_logo_path(team_id, letter)
+    with tempfile.NamedTemporaryFile(dir=LOGO_DIRECTORY, delete=False) as logo_file:
+        logo_file.write(png_data)
+    os.chmod(logo_file.name, 0o644)
+    os.replace(logo_file.name, logo_path)
+
+
+# Fetch a team's SVG logo and rasterize it
+def render_team_logo(team_id, letter):
+    # cairosvg is heavy to import and is only needed until the logos are on disk
+    import cairosvg
+
     logo_url = f"https://cdn.nba.com/logos/nba/{team_id}/primary/{letter}/logo.svg"
 
     # Fetch the SVG logo from the URL
-    try:
-        response = requests.get(logo_url)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"Error fetching logo: {e}"}), 500
+    response = SESSION.get(logo_url, timeout=CDN_TIMEOUT)
+    response.raise_for_status()
 
     # Convert the SVG data to PNG using cairosvg
-    try:
-        svg_data = response.text
-        png_data = cairosvg.svg2png(bytestring=svg_data)
-    except Exception as e:
-        return jsonify({"error": f"Error converting SVG to PNG: {e}"}), 500
+    return cairosvg.svg2png(bytestring=response.text)
 
-    # Use BytesIO to create a stream for the image data
-    image_data = BytesIO(png_data)
 
-    # Return the image data in the response
-    return send_file(
-        image_data,
-        mimetype="image/png",
-        as_attachment=True,
-        download_name=f"{abbreviation}_logo.png",
-    )
+# Function to look up a team by abbreviation. nba_api scans its static team
+# list with a regex on every call, and the teams never change, so memoize it
+@lru_cache(maxsize=64)
+def find_team(abbreviation):
+    return teams.find_team_by_abbreviation(abbreviation)
 
 
 # Endpoint to get a team by abbreviation
 # Sample URL: https://normal-dinosaur-yearly.ngrok-free.app/api/nba/team/LAL
 @app.route("/api/nba/team/<abbreviation>", methods=["GET"])
 def get_team_by_abbreviation(abbreviation):
-    team = teams.find_team_by_abbreviation(abbreviation)
+    team = find_team(abbreviation)
 
     if team:
-        return jsonify(team)
+        return ojsonify(team)
     else:
-        return jsonify({"error": "Team not found"}), 404
+        return ojsonify({"error": "Team not found"}), 404
 
 
 @app.route("/api/nba/unplayedgames/<date>", methods=["GET"])
 def get_unplayed_games_by_date(date):
-    url = "https://stats.nba.com/stats/internationalbroadcasterschedule"
-
-    formatted_date = datetime.strptime(date, "%m-%d-%Y").strftime("%m/%d/%Y")
-
-    # Extract the year from the provided date parameter
-    year = formatted_date.split("/")[2]
-
-    # Define the parameters for the API request
-    params = {
-        "LeagueID": "00",
-        "Season": year,
-        "RegionID": "0",
-        "Date": formatted_date,
-        "EST": "Y",
-    }
-
     # Make the API request
-    response = requests.get(url, params=params)
+    return build_unplayed_games_response(fetch_unplayed_schedule(date))
+
 
+# Function to turn a broadcaster schedule response into the unplayed games payload
+def build_unplayed_games_response(response):
     # Check if the request was successful (status code 200)
     if response.status_code == 200:
         # Extract relevant information from the API response
@@ -144,22 +271,50 @@ def get_unplayed_games_by_date(date):
                 unplayed_games.append(unplayed_game)
 
         if not unplayed_games:
-            return jsonify({"games": []})
+            return ojsonify({"games": []})
 
-        return jsonify({"games": unplayed_games})
+        return ojsonify({"games": unplayed_games})
     else:
         # If the request was not successful, return an error message
-        return jsonify(
+        return ojsonify(
             {"error": f"Failed to retrieve data. Status code: {response.status_code}"}
         )
 
 
+# Function to request the broadcaster schedule, which also lists unplayed games
+def fetch_unplayed_schedule(date):
+    url = "https://stats.nba.com/stats/internationalbroadcasterschedule"
+
+    formatted_date = datetime.strptime(date, "%m-%d-%Y").strftime("%m/%d/%Y")
+
+    # Extract the year from the provided date parameter
+    year = formatted_date.split("/")[2]
+
+    # Define the parameters for the API request
+    params = {
+        "LeagueID": "00",
+        "Season": year,
+        "RegionID": "0",
+        "Date": formatted_date,
+        "EST": "Y",
+    }
+
+    return SESSION.get(url, params=params, timeout=STATS_TIMEOUT)
+
+
 # Endpoint to get all NBA games on a certain date
 # Sample URL: https://normal-dinosaur-yearly.ngrok-free.app/api/nba/games/11-17-2023
 @app.route("/api/nba/games/<date>", methods=["GET"])
 def get_games_by_date(date):
     # Convert the date from the URL to the required format (e.g., "03-28-2021" to "03/28/2021")
-    formatted_date = datetime.strptime(date, "%m-%d-%Y").strftime("%m/%d/%Y")
+    game_date = datetime.strptime(date, "%m-%d-%Y")
+    formatted_date = game_date.strftime("%m/%d/%Y")
+
+    # Games after today can't have been played yet, so start the fallback
+    # request now and let it run alongside the leaguegamefinder query
+    schedule = None
+    if game_date.date() > datetime.now().date():
+        schedule = IO_EXECUTOR.submit(fetch_unplayed_schedule, date)
 
     # Query for games on the specified date
     game_finder = leaguegamefinder.LeagueGameFinder(
@@ -168,114 +323,102 @@ def get_games_by_date(date):
         location_nullable=LocationNullable.default,
         league_id_nullable="00",
         headers=STATS_HEADERS,
+        timeout=STATS_TIMEOUT,
     )
 
     # Get the games DataFrame
     games_dataframe = game_finder.get_data_frames()[0]
 
-    # Convert DataFrame to list of dictionaries with selected columns
-    games_list = games_dataframe.to_dict(orient="records")
-
     # Combine and format the data based on home and away teams
-    combined_data = combine_game_data(games_list)
+    combined_data = combine_game_data(games_dataframe)
+
+    if combined_data.empty:
+        # If the result is empty, fall back to the second endpoint
+        if schedule is None:
+            response = fetch_unplayed_schedule(date)
+        else:
+            response = schedule.result()
+        return build_unplayed_games_response(response)
+
+    # Serialize straight from the DataFrame rather than through a list of dicts
+    games_json = combined_data.to_json(orient="records", double_precision=15)
+    return Response(f'{{"games":{games_json}}}', mimetype="application/json")
+
+
+# Per-team columns from leaguegamefinder that are reported for both sides of a game
+GAME_TEAM_COLUMNS = [
+    "AST",
+    "BLK",
+    "DREB",
+    "FG3A",
+    "FG3M",
+    "FG3_PCT",
+    "FGA",
+    "FGM",
+    "FG_PCT",
+    "FTA",
+    "FTM",
+    "FT_PCT",
+    "MIN",
+    "OREB",
+    "PF",
+    "PLUS_MINUS",
+    "PTS",
+    "REB",
+    "STL",
+    "TEAM_ABBREVIATION",
+    "TEAM_ID",
+    "TEAM_NAME",
+    "TOV",
+    "WL",
+]
 
-    if not combined_data:
-        # If the result is empty, call the second endpoint
-        return get_unplayed_games_by_date(date)
 
-    return jsonify({"games": combined_data})
+# Function to combine and format game data based on home and away teams
+def combine_game_data(games_dataframe):
+    # Each game has one row per team, split them by the side the team played on
+    matchup = games_dataframe["MATCHUP"]
+    is_home = matchup.str.contains("vs.", regex=False)
+    is_away = ~is_home & matchup.str.contains("@", regex=False)
+
+    game_ids = games_dataframe["GAME_ID"].unique()
+    home = align_team_games(games_dataframe[is_home], game_ids)
+    away = align_team_games(games_dataframe[is_away], game_ids)
+
+    combined_data = {
+        "GAME_ID": game_ids,
+        "GAME_DATE": home["GAME_DATE"],
+        "SEASON_ID": home["SEASON_ID"],
+        "MATCHUP": [
+            f"{away_abbreviation or ''} @ {home_abbreviation or ''}"
+            for away_abbreviation, home_abbreviation in zip(
+                away["TEAM_ABBREVIATION"], home["TEAM_ABBREVIATION"]
+            )
+        ],
+    }
+    for column in GAME_TEAM_COLUMNS:
+        combined_data[f"HOME_{column}"] = home[column]
+        combined_data[f"AWAY_{column}"] = away[column]
 
+    # Points have always been sent as strings
+    combined_data["HOME_PTS"] = home["PTS"].astype(str).astype(object)
+    combined_data["AWAY_PTS"] = away["PTS"].astype(str).astype(object)
 
-# Function to combine and format game data based on home and away teams
-def combine_game_data(data):
-    # Create a dictionary to store combined data
-    combined_data = {}
-
-    # Iterate through the list of dictionaries
-    for game in data:
-        game_id = game["GAME_ID"]
-
-        # Check if the game_id is already in combined_data
-        if game_id not in combined_data:
-            combined_data[game_id] = {}
-
-        # Determine home and away teams
-        home_team = game if "vs." in game["MATCHUP"] else None
-        away_team = game if "@" in game["MATCHUP"] else None
-
-        # Combine data for home and away teams
-        if home_team:
-            combined_data[game_id]["HOME"] = home_team
-        elif away_team:
-            combined_data[game_id]["AWAY"] = away_team
-
-    # Create a list to store the final combined data
-    final_combined_data = []
-
-    # Iterate through the combined data
-    for game_id, teams_data in combined_data.items():
-        home_team = teams_data.get("HOME", {})
-        away_team = teams_data.get("AWAY", {})
-
-        combined_game_data = {
-            "HOME_AST": home_team.get("AST", None),
-            "AWAY_AST": away_team.get("AST", None),
-            "HOME_BLK": home_team.get("BLK", None),
-            "AWAY_BLK": away_team.get("BLK", None),
-            "HOME_DREB": home_team.get("DREB", None),
-            "AWAY_DREB": away_team.get("DREB", None),
-            "HOME_FG3A": home_team.get("FG3A", None),
-            "AWAY_FG3A": away_team.get("FG3A", None),
-            "HOME_FG3M": home_team.get("FG3M", None),
-            "AWAY_FG3M": away_team.get("FG3M", None),
-            "HOME_FG3_PCT": home_team.get("FG3_PCT", None),
-            "AWAY_FG3_PCT": away_team.get("FG3_PCT", None),
-            "HOME_FGA": home_team.get("FGA", None),
-            "AWAY_FGA": away_team.get("FGA", None),
-            "HOME_FGM": home_team.get("FGM", None),
-            "AWAY_FGM": away_team.get("FGM", None),
-            "HOME_FG_PCT": home_team.get("FG_PCT", None),
-            "AWAY_FG_PCT": away_team.get("FG_PCT", None),
-            "HOME_FTA": home_team.get("FTA", None),
-            "AWAY_FTA": away_team.get("FTA", None),
-            "HOME_FTM": home_team.get("FTM", None),
-            "AWAY_FTM": away_team.get("FTM", None),
-            "HOME_FT_PCT": home_team.get("FT_PCT", None),
-            "AWAY_FT_PCT": away_team.get("FT_PCT", None),
-            "GAME_DATE": home_team.get("GAME_DATE", None),
-            "GAME_ID": game_id,
-            "MATCHUP": f"{away_team.get('TEAM_ABBREVIATION', '')} @ {home_team.get('TEAM_ABBREVIATION', '')}",
-            "HOME_MIN": home_team.get("MIN", None),
-            "AWAY_MIN": away_team.get("MIN", None),
-            "HOME_OREB": home_team.get("OREB", None),
-            "AWAY_OREB": away_team.get("OREB", None),
-            "HOME_PF": home_team.get("PF", None),
-            "AWAY_PF": away_team.get("PF", None),
-            "HOME_PLUS_MINUS": home_team.get("PLUS_MINUS", None),
-            "AWAY_PLUS_MINUS": away_team.get("PLUS_MINUS", None),
-            "HOME_PTS": str(home_team.get("PTS", None)),
-            "AWAY_PTS": str(away_team.get("PTS", None)),
-            "HOME_REB": home_team.get("REB", None),
-            "AWAY_REB": away_team.get("REB", None),
-            "SEASON_ID": home_team.get("SEASON_ID", None),
-            "HOME_STL": home_team.get("STL", None),
-            "AWAY_STL": away_team.get("STL", None),
-            "HOME_TEAM_ABBREVIATION": home_team.get("TEAM_ABBREVIATION", None),
-            "AWAY_TEAM_ABBREVIATION": away_team.get("TEAM_ABBREVIATION", None),
-            "HOME_TEAM_ID": home_team.get("TEAM_ID", None),
-            "AWAY_TEAM_ID": away_team.get("TEAM_ID", None),
-            "HOME_TEAM_NAME": home_team.get("TEAM_NAME", None),
-            "AWAY_TEAM_NAME": away_team.get("TEAM_NAME", None),
-            "HOME_TOV": home_team.get("TOV", None),
-            "AWAY_TOV": away_team.get("TOV", None),
-            "HOME_WL": home_team.get("WL", None),
-            "AWAY_WL": away_team.get("WL", None),
-        }
-
-        # Append the combined game data to the final list
-        final_combined_data.append(combined_game_data)
-
-    return final_combined_data
+    return pd.DataFrame(combined_data)
+
+
+# Function to line one side's rows up with game_ids, as one array per column
+def align_team_games(team_games, game_ids):
+    columns = GAME_TEAM_COLUMNS + ["GAME_DATE", "SEASON_ID"]
+    team_games = team_games.drop_duplicates("GAME_ID", keep="last")
+
+    # Games this side is missing from index the all-None row added at the end
+    values = np.vstack(
+        [team_games[columns].to_numpy(dtype=object), np.full(len(columns), None)]
+    )
+    rows = pd.Index(team_games["GAME_ID"]).get_indexer(game_ids)
+
+    return dict(zip(columns, values[rows].T))
 
 
 # Endpoint for shot chart with parameters
@@ -290,16 +433,29 @@ def get_shot_chart():
     if not all([player_id, game_id_nullable, team_id, season_type_all_star]):
         return "Missing required parameters", 400
 
-    shot_chart_filename = generate_shot_chart(
+    png_data, etag = generate_shot_chart(
         player_id, game_id_nullable, team_id, season_type_all_star
     )
+
+    # The ETag lets browsers revalidate with a 304 instead of a new download
     return send_file(
-        shot_chart_filename,
+        BytesIO(png_data),
         mimetype="image/png",
         as_attachment=True,
+        download_name=SHOT_CHART_FILENAME_TEMPLATE.format(
+            player_id=player_id, game_id_nullable=game_id_nullable, team_id=team_id
+        ),
+        etag=etag,
     )
 
 
+# Repeat requests for the same chart are served from memory instead of
+# hitting stats.nba.com and Matplotlib again. The PNG is cached together
+# with its ETag so cache hits don't hash it again.
+@cached(
+    TTLCache(maxsize=SHOT_CHART_CACHE_SIZE, ttl=SHOT_CHART_CACHE_TTL),
+    lock=threading.Lock(),
+)
 def generate_shot_chart(
     player_id,
     game_id_nullable,
@@ -314,47 +470,85 @@ def generate_shot_chart(
         context_measure_simple=context_measure_simple,
         season_type_all_star=season_type_all_star,
         headers=STATS_HEADERS,
+        timeout=STATS_TIMEOUT,
     )
     shot_dataframe = shot_detail.get_data_frames()[0]
 
-    made_shot = shot_dataframe[shot_dataframe.SHOT_MADE_FLAG == 1]
-    missed_shot = shot_dataframe[shot_dataframe.SHOT_MADE_FLAG == 0]
-
-    fig = plt.figure(figsize=(12, 10))
-    fig.patch.set_facecolor("black")
-    draw_court(outer_lines=True)
-    plt.scatter(
-        missed_shot.LOC_X,
-        missed_shot.LOC_Y,
-        s=200,
-        facecolors=lighten_color("Red", 0.8),
-        linewidths=3,
-        marker="x",
-        alpha=1,
+    # Pull plain arrays out once and split them with a single mask
+    loc_x = shot_dataframe["LOC_X"].to_numpy()
+    loc_y = shot_dataframe["LOC_Y"].to_numpy()
+    made = shot_dataframe["SHOT_MADE_FLAG"].to_numpy() == 1
+
+    png_data = render_shot_chart(loc_x, loc_y, made)
+    return png_data, hashlib.md5(png_data).hexdigest()
+
+
+# Function to stamp the shots onto the court and encode the chart as a PNG
+def render_shot_chart(loc_x, loc_y, made):
+    shot_chart = COURT_IMAGE.copy()
+
+    # Pixel each shot is centred on
+    x_scale, x_offset, y_scale, y_offset = COURT_PIXEL_TRANSFORM
+    columns = np.rint(loc_x * x_scale + x_offset).astype(np.intp)
+    rows = np.rint(loc_y * y_scale + y_offset).astype(np.intp)
+
+    # The image only covers the half court, so shots from past it (backcourt
+    # heaves) are pulled in to the edge rather than silently left off
+    height, width = shot_chart.shape[:2]
+    marker_radius = SHOT_MARKER_SIZE // 2
+    for pixels, size in [(rows, height), (columns, width)]:
+        off_court = (pixels < 0) | (pixels >= size)
+        pixels[off_court] = np.clip(
+            pixels[off_court], marker_radius, size - 1 - marker_radius
+        )
+
+    # Missed shots go down first so made shots are drawn over them
+    stamp_markers(shot_chart, MISSED_SHOT_MARKER, rows[~made], columns[~made])
+    stamp_markers(shot_chart, MADE_SHOT_MARKER, rows[made], columns[made])
+
+    # Encode the shot chart straight to memory, nothing touches the disk
+    png_buffer = BytesIO()
+    Image.fromarray(shot_chart).save(
+        png_buffer, format="PNG", compress_level=SHOT_CHART_COMPRESS_LEVEL
     )
-    plt.scatter(
-        made_shot.LOC_X,
-        made_shot.LOC_Y,
-        s=200,
-        facecolors="none",
-        edgecolors=lighten_color("Green", 0.7),
-        linewidths=2.5,
-        marker="o",
-        alpha=1,
+    return png_buffer.getvalue()
+
+
+# Function to alpha composite one kind of marker onto the image at every
+# (row, column), clipping whatever falls outside the image
+def stamp_markers(image, marker, rows, columns):
+    color, marker_rows, marker_columns, marker_log_transparency = marker
+    height, width = image.shape[:2]
+
+    # Every marker pixel of every shot, as a row and column in the image
+    pixel_rows = (rows[:, None] + marker_rows).ravel()
+    pixel_columns = (columns[:, None] + marker_columns).ravel()
+    inside = (
+        (pixel_rows >= 0)
+        & (pixel_rows < height)
+        & (pixel_columns >= 0)
+        & (pixel_columns < width)
     )
-    plt.xlim(300, -300)
-    plt.gca().invert_xaxis()
-    plt.gca().invert_yaxis()
-    plt.axis("off")
-
-    # Save the shot chart as an image file
-    shot_chart_filename = SHOT_CHART_FILENAME_TEMPLATE.format(
-        player_id=player_id, game_id_nullable=game_id_nullable, team_id=team_id
+
+    # Markers of one kind share a color, so overlapping markers only stack
+    # their coverage: where they overlap, their transparencies multiply
+    log_transparency = np.bincount(
+        pixel_rows[inside] * width + pixel_columns[inside],
+        weights=np.tile(marker_log_transparency, len(rows))[inside],
+        minlength=height * width,
     )
-    plt.savefig(
-        shot_chart_filename, bbox_inches="tight", pad_inches=0, transparent=True
+    pixels = np.flatnonzero(log_transparency)
+    source_alpha = -np.expm1(log_transparency[pixels])[:, None]
+
+    # "Over" operator on straight (not premultiplied) alpha, as Agg produces
+    image_pixels = image.reshape(-1, 4)
+    target = image_pixels[pixels] / 255
+    target_alpha = target[:, 3:] * (1 - source_alpha)
+    alpha = source_alpha + target_alpha
+    color = (color * source_alpha + target[:, :3] * target_alpha) / np.maximum(
+        alpha, 1e-6
     )
-    return shot_chart_filename
+    image_pixels[pixels] = np.rint(np.hstack([color, alpha]) * 255)
 
 
 def lighten_color(color_name, amount=0.5):
@@ -370,10 +564,18 @@ def lighten_color(color_name, amount=0.5):
     return lightened_color_rgb
 
 
-def draw_court(ax=None, color=lighten_color("white", 1), lw=3, outer_lines=False):
-    # If an axes object isn't provided to plot onto, just get current one
+# Chart colors never change, so work them out once instead of per request
+MISSED_SHOT_COLOR = lighten_color("Red", 0.8)
+MADE_SHOT_COLOR = lighten_color("Green", 0.7)
+COURT_COLOR = lighten_color("white", 1)
+
+
+def draw_court(ax=None, color=COURT_COLOR, lw=3, outer_lines=False):
+    # If an axes object isn't provided to plot onto, draw onto a new figure
     if ax is None:
-        ax = plt.gca()
+        fig = Figure(figsize=(12, 10))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
 
     # Create the various parts of an NBA basketball court
 
@@ -442,7 +644,7 @@ def draw_court(ax=None, color=lighten_color("white", 1), lw=3, outer_lines=False
     )
 
     # List of the court elements to be plotted onto the axes
-    court_elements = [
+    court_elements = (
         outer_lines,
         hoop,
         backboard,
@@ -457,18 +659,90 @@ def draw_court(ax=None, color=lighten_color("white", 1), lw=3, outer_lines=False
         center_outer_arc,
         center_inner_arc,
         outer_lines2,
-    ]
+    )
 
-    # Add the court elements onto the axes
-    for element in court_elements:
-        ax.add_patch(element)
+    # Add the court elements onto the axes as one collection, keeping each
+    # element's own style, so they are drawn in a single pass
+    ax.add_collection(PatchCollection(court_elements, match_original=True))
 
     return ax
 
 
+# Render the court once at import time; every shot chart is stamped on top of it
+def render_court_image():
+    fig = Figure(figsize=(12, 10))
+    FigureCanvasAgg(fig)
+    fig.patch.set_facecolor("none")
+    ax = fig.add_subplot(111)
+    draw_court(ax=ax, outer_lines=True)
+    ax.set_xlim(-300, 300)
+    ax.autoscale_view()
+    ax.invert_yaxis()
+    ax.axis("off")
+    fig.canvas.draw()
+
+    # Keep just the axes, which is all bbox_inches="tight" used to keep
+    height = fig.canvas.get_width_height()[1]
+    left, bottom, right, top = np.rint(ax.bbox.extents).astype(int)
+    court_image = np.asarray(fig.canvas.buffer_rgba())[
+        height - top : height - bottom, left:right
+    ].copy()
+
+    # Court coordinates map linearly onto the columns and rows of the image
+    (x0, y0), (x1, y1) = ax.transData.transform([(0, 0), (1, 1)])
+    pixel_transform = (x1 - x0, x0 - left, y0 - y1, top - y0)
+
+    # Every render starts from this image, so make sure none can draw on it
+    court_image.setflags(write=False)
+
+    return court_image, pixel_transform
+
+
+# Render a single shot marker once and keep its color plus, for each pixel
+# it covers, the offset from the marker's centre and log(1 - alpha)
+def render_shot_marker(**scatter_kwargs):
+    fig = Figure(figsize=(SHOT_MARKER_SIZE / 100, SHOT_MARKER_SIZE / 100), dpi=100)
+    FigureCanvasAgg(fig)
+    fig.patch.set_facecolor("none")
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(-1, 1)
+    ax.set_ylim(-1, 1)
+    ax.axis("off")
+    ax.scatter([0], [0], s=200, alpha=1, **scatter_kwargs)
+    fig.canvas.draw()
+
+    marker = np.asarray(fig.canvas.buffer_rgba()) / 255
+    rows, columns = np.nonzero(marker[..., 3])
+    alpha = np.minimum(marker[rows, columns, 3], 1 - 1e-6)
+
+    # Shared by every render, so make sure none can change it
+    marker = (
+        marker[rows[0], columns[0], :3],
+        rows - SHOT_MARKER_SIZE // 2,
+        columns - SHOT_MARKER_SIZE // 2,
+        np.log1p(-alpha),
+    )
+    for values in marker:
+        values.setflags(write=False)
+
+    return marker
+
+
+# Side of the square each shot marker is rendered into, in pixels
+SHOT_MARKER_SIZE = 32
+
+COURT_IMAGE, COURT_PIXEL_TRANSFORM = render_court_image()
+MISSED_SHOT_MARKER = render_shot_marker(
+    facecolors=MISSED_SHOT_COLOR, linewidths=3, marker="x"
+)
+MADE_SHOT_MARKER = render_shot_marker(
+    facecolors="none", edgecolors=MADE_SHOT_COLOR, linewidths=2.5, marker="o"
+)
+
+
 # Endpoint to get today's NBA scoreboard
 # Sample URL: https://normal-dinosaur-yearly.ngrok-free.app/api/nba/todays_scoreboard
 @app.route("/api/nba/todays_scoreboard", methods=["GET"])
 def get_todays_scoreboard():
-    games = scoreboard.ScoreBoard()
-    return jsonify(games.get_dict())
+    games = scoreboard.ScoreBoard(timeout=STATS_TIMEOUT)
+    return ojsonify(games.get_dict())
@@ -1,5 +1,9 @@
 #!/bin/bash
 
+# Rasterize any team logos not already on disk so the logo endpoint can serve
+# them from there; a failed logo is reported and rendered on demand later
+flask --app app render-logos
+
 # Start Flask app
 gunicorn -w 5 app:app &
 